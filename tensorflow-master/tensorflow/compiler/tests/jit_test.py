@@ -74,7 +74,7 @@ def RunMetadataLabels(run_metadata):
 
 def InLabels(labels, substr):
   """Returns true iff one of the labels contains substr."""
-  return any([substr in x for x in labels])
+  return any(substr in x for x in labels)
 
 
 def MetadataHasXlaOp(run_metadata):
@@ -86,6 +86,20 @@ def MetadataHasXlaOp(run_metadata):
 
 class JitLaunchTest(test.TestCase):
 
+  @classmethod
+  def setUpClass(cls):
+    super(JitLaunchTest, cls).setUpClass()
+    # Weights, biases and images for the MNIST inference tests, drawn once.
+    batch_size = 16
+    image_size = 28 * 28
+    num_classes = 10
+    rng = np.random.RandomState(0)
+    cls._mnist_w = rng.random_sample(
+        (image_size, num_classes)).astype(np.float32)
+    cls._mnist_b = rng.random_sample((num_classes)).astype(np.float32)
+    cls._mnist_x = rng.random_sample(
+        (batch_size, image_size)).astype(np.float32)
+
   # Evaluates 'fn' on 'args' both directly and as a compiled XLA kernel.
   # Verifies that the outputs match and that XLA was invoked. 'fn' must take
   # the same number of tensors as arguments that are in 'args', and must return
@@ -95,14 +109,12 @@ class JitLaunchTest(test.TestCase):
   # node actually ran. However, it is sometimes possible for XlaCompile/XlaRun
   # ops to be constant-folded away, so the check is optional.
   def _compare(self, fn, args, require_kernel_launch=True, noinline=None):
-    with session_lib.Session(config=NoRewriteSessionConfig()) as sess:
-      placeholders = []
-      feeds = {}
-      for arg in args:
-        placeholder = array_ops.placeholder(
-            dtypes.as_dtype(arg.dtype), list(arg.shape))
-        placeholders.append(placeholder)
-        feeds[placeholder] = arg
+    with ops.Graph().as_default(), session_lib.Session(
+        config=NoRewriteSessionConfig()) as sess:
+      placeholders = tuple(
+          array_ops.placeholder(dtypes.as_dtype(arg.dtype), arg.shape)
+          for arg in args)
+      feeds = dict(zip(placeholders, args))
 
       compiled_op = CompiledKernel(fn, *placeholders, noinline=noinline)
       direct_op = fn(*placeholders)
@@ -216,25 +228,15 @@ class JitLaunchTest(test.TestCase):
 
   def testMnistForwardFunc(self):
     """Compute inference function from MNIST beginners tutorial."""
-    batch_size = 16
-    image_size = 28 * 28
-    num_classes = 10
 
     # Define a TensorFlow function to compute the forward pass.
     def MnistForward(w, b, x):
       return nn_ops.softmax(math_ops.matmul(x, w) + b)
 
-    w = np.random.random_sample((image_size, num_classes)).astype(np.float32)
-    b = np.random.random_sample((num_classes)).astype(np.float32)
-    x = np.random.random_sample((batch_size, image_size)).astype(np.float32)
-    self._compare(MnistForward, [w, b, x])
+    self._compare(MnistForward, [self._mnist_w, self._mnist_b, self._mnist_x])
 
   def testExplicitMarking(self):
     """Test explicit marking of operators to compile."""
-    batch_size = 16
-    image_size = 28 * 28
-    num_classes = 10
-
     with ops.Graph().as_default():
       x = array_ops.placeholder(dtypes.float32)
       w = array_ops.placeholder(dtypes.float32)
@@ -245,9 +247,9 @@ class JitLaunchTest(test.TestCase):
       with jit_scope():
         y = math_ops.square(y2)
 
-      dw = np.random.random_sample((image_size, num_classes)).astype(np.float32)
-      db = np.random.random_sample((num_classes)).astype(np.float32)
-      dx = np.random.random_sample((batch_size, image_size)).astype(np.float32)
+      dw = self._mnist_w
+      db = self._mnist_b
+      dx = self._mnist_x
       with session_lib.Session() as sess:
         run_metadata = config_pb2.RunMetadata()
         output = sess.run(y, {x: dx,
@@ -484,10 +486,11 @@ class ElementWiseFusionTest(test.TestCase):
           options=config_pb2.RunOptions(
               trace_level=config_pb2.RunOptions.FULL_TRACE))
 
-      labels = RunMetadataLabels(run_metadata)
-
-      xla_compile_count = sum("XlaCompile(" in x for x in labels)
-      xla_run_count = sum("XlaRun(" in x for x in labels)
+      xla_compile_count = 0
+      xla_run_count = 0
+      for x in RunMetadataLabels(run_metadata):
+        xla_compile_count += "XlaCompile(" in x
+        xla_run_count += "XlaRun(" in x
       self.assertEqual(xla_compile_count, xla_run_count)
 
       return output, xla_run_count
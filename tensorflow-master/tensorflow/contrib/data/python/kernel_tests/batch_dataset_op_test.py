@@ -24,6 +24,7 @@ from absl.testing import parameterized
 import numpy as np
 
 from tensorflow.contrib.data.python.ops import batching
+from tensorflow.contrib.data.python.ops import optimization
 from tensorflow.python.client import session
 from tensorflow.python.data.kernel_tests import test_base
 from tensorflow.python.data.ops import dataset_ops
@@ -105,6 +106,18 @@ class BatchDatasetTest(test_base.DatasetTestBase, parameterized.TestCase):
       with self.assertRaises(errors.OutOfRangeError):
         sess.run(get_next)
 
+  def testDenseToSparseBatchDatasetWithTensorRowShape(self):
+    row_shape = constant_op.constant([5, -1], dtype=dtypes.int64)
+    dataset = dataset_ops.Dataset.from_tensors(
+        array_ops.zeros([2, 3], dtype=dtypes.int32)).apply(
+            batching.dense_to_sparse_batch(4, row_shape))
+    self.assertEqual([None, 5, None], dataset.output_shapes.as_list())
+
+    get_next = dataset.make_one_shot_iterator().get_next()
+
+    with self.cached_session() as sess:
+      self.assertAllEqual([1, 5, 3], sess.run(get_next).dense_shape)
+
   def testDenseToSparseBatchDatasetWithInvalidShape(self):
     input_tensor = array_ops.constant([[1]])
     with self.assertRaisesRegexp(ValueError, "Dimension -2 must be >= 0"):
@@ -152,6 +165,20 @@ class BatchDatasetTest(test_base.DatasetTestBase, parameterized.TestCase):
       with self.assertRaises(errors.OutOfRangeError):
         sess.run(op)
 
+  def testUnbatchSingleTransformation(self):
+    data = dataset_ops.Dataset.range(10).batch(3).apply(
+        optimization.assert_next(["Unbatch"])).apply(batching.unbatch())
+
+    iterator = data.make_one_shot_iterator()
+    op = iterator.get_next()
+
+    with self.cached_session() as sess:
+      for i in range(10):
+        self.assertEqual(i, sess.run(op))
+
+      with self.assertRaises(errors.OutOfRangeError):
+        sess.run(op)
+
   def testUnbatchDatasetWithStrings(self):
     data = tuple([math_ops.range(10) for _ in range(3)])
     data = dataset_ops.Dataset.from_tensor_slices(data)
@@ -428,6 +455,7 @@ class BatchDatasetTest(test_base.DatasetTestBase, parameterized.TestCase):
       ("Default", None, None),
       ("SequentialCalls", 1, None),
       ("ParallelCalls", 2, None),
+      ("ParallelCallsAutotune", optimization.AUTOTUNE, None),
       ("ParallelBatches", None, 10),
   )
   def testMapAndBatch(self, num_parallel_calls, num_parallel_batches):
@@ -539,6 +567,65 @@ class BatchDatasetTest(test_base.DatasetTestBase, parameterized.TestCase):
       with self.assertRaises(errors.OutOfRangeError):
         sess.run(next_element)
 
+  def testMapAndBatchStaticBatchSizeFromTensor(self):
+    dataset = dataset_ops.Dataset.range(10).apply(
+        batching.map_and_batch(
+            lambda x: array_ops.reshape(x * x, [1]),
+            constant_op.constant(4, dtype=dtypes.int64),
+            num_parallel_batches=constant_op.constant(2),
+            drop_remainder=constant_op.constant(True)))
+    self.assertEqual([4, 1], dataset.output_shapes.as_list())
+
+    next_element = dataset.make_one_shot_iterator().get_next()
+    with self.cached_session() as sess:
+      self.assertAllEqual([[0], [1], [4], [9]], sess.run(next_element))
+      self.assertAllEqual([[16], [25], [36], [49]], sess.run(next_element))
+      with self.assertRaises(errors.OutOfRangeError):
+        sess.run(next_element)
+
+  def testMapAndBatchCreatedInOtherGraph(self):
+    with ops.Graph().as_default():
+      transformation = batching.map_and_batch(
+          lambda x: array_ops.reshape(x * x, [1]), 4, num_parallel_batches=2)
+    iterator = (dataset_ops.Dataset.range(10)
+                .apply(transformation)
+                .make_one_shot_iterator())
+    next_element = iterator.get_next()
+    with self.cached_session() as sess:
+      self.assertAllEqual([[0], [1], [4], [9]], sess.run(next_element))
+      self.assertAllEqual([[16], [25], [36], [49]], sess.run(next_element))
+      self.assertAllEqual([[64], [81]], sess.run(next_element))
+      with self.assertRaises(errors.OutOfRangeError):
+        sess.run(next_element)
+
+  @parameterized.named_parameters(
+      ("TensorBatchSize", True, False),
+      ("TensorNumParallelBatches", False, True),
+      ("TensorBoth", True, True),
+  )
+  def testMapAndBatchTensorNumParallelBatches(self, tensor_batch_size,
+                                              tensor_num_parallel_batches):
+    batch_size = 4
+    num_parallel_batches = 2
+    if tensor_batch_size:
+      batch_size = constant_op.constant(batch_size, dtype=dtypes.int64)
+    if tensor_num_parallel_batches:
+      num_parallel_batches = constant_op.constant(num_parallel_batches)
+    dataset = dataset_ops.Dataset.range(10).apply(
+        batching.map_and_batch(
+            lambda x: array_ops.reshape(x * x, [1]),
+            batch_size,
+            num_parallel_batches=num_parallel_batches))
+    self.assertEqual([None, 1], dataset.output_shapes.as_list())
+
+    next_element = dataset.make_one_shot_iterator().get_next()
+    with self.cached_session() as sess:
+      self.assertAllEqual([[0], [1], [4], [9]], sess.run(next_element))
+      self.assertAllEqual([[16], [25], [36], [49]], sess.run(next_element))
+      self.assertAllEqual([[64], [81]], sess.run(next_element))
+      with self.assertRaises(errors.OutOfRangeError):
+        sess.run(next_element)
+
   def testMapAndBatchParallelGetNext(self):
     iterator = (dataset_ops.Dataset.range(50000)
                 .apply(batching.map_and_batch(lambda x: x, batch_size=100))
@@ -735,6 +822,8 @@ class RestructuredDatasetTest(test_base.DatasetTestBase):
 
     result = dataset.apply(batching.assert_element_shape(expected_shapes))
     self.assertEqual(expected_shapes, result.output_shapes)
+    # Fully defined shapes are checked statically, without an extra map.
+    self.assertIs(dataset, result)
 
     iterator = result.make_initializable_iterator()
     init_op = iterator.initializer
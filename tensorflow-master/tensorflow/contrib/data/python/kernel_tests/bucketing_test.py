@@ -17,11 +17,11 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-import random
-
 import numpy as np
 
+from tensorflow.contrib.data.python.ops import batching
 from tensorflow.contrib.data.python.ops import grouping
+from tensorflow.contrib.data.python.ops import optimization
 from tensorflow.python.data.kernel_tests import test_base
 from tensorflow.python.data.ops import dataset_ops
 from tensorflow.python.framework import constant_op
@@ -38,26 +38,34 @@ from tensorflow.python.platform import test
 
 class GroupByReducerTest(test_base.DatasetTestBase):
 
-  def checkResults(self, dataset, shapes, values):
+  # `runs` is a list of `(feed_dict, values)` pairs. For each pair, the
+  # iterator over `dataset` is initialized with `feed_dict` and its output is
+  # checked against `values`.
+  def checkResults(self, dataset, shapes, runs):
     self.assertEqual(shapes, dataset.output_shapes)
-    get_next = dataset.make_one_shot_iterator().get_next()
+    # Fetch all of the expected elements of each run with a single run.
+    batch_size = max(len(values) for _, values in runs)
+    iterator = dataset.batch(batch_size).make_initializable_iterator()
+    get_next = iterator.get_next()
     with self.cached_session() as sess:
-      for expected in values:
-        got = sess.run(get_next)
-        self.assertEqual(got, expected)
-      with self.assertRaises(errors.OutOfRangeError):
-        sess.run(get_next)
+      for feed_dict, values in runs:
+        sess.run(iterator.initializer, feed_dict=feed_dict)
+        self.assertAllEqual(values, sess.run(get_next))
+        with self.assertRaises(errors.OutOfRangeError):
+          sess.run(get_next)
 
   def testSum(self):
     reducer = grouping.Reducer(
         init_func=lambda _: np.int64(0),
         reduce_func=lambda x, y: x + y,
         finalize_func=lambda x: x)
-    for i in range(1, 11):
-      dataset = dataset_ops.Dataset.range(2 * i).apply(
-          grouping.group_by_reducer(lambda x: x % 2, reducer))
-      self.checkResults(
-          dataset, shapes=tensor_shape.scalar(), values=[(i - 1) * i, i * i])
+    num_elements = array_ops.placeholder(dtypes.int64, shape=[])
+    dataset = dataset_ops.Dataset.range(num_elements).apply(
+        grouping.group_by_reducer(lambda x: x % 2, reducer))
+    self.checkResults(
+        dataset, shapes=tensor_shape.scalar(),
+        runs=[({num_elements: 2 * i}, [(i - 1) * i, i * i])
+              for i in range(1, 11)])
 
   def testAverage(self):
 
@@ -69,28 +77,30 @@ class GroupByReducerTest(test_base.DatasetTestBase):
         init_func=lambda _: (0.0, 0.0),
         reduce_func=reduce_fn,
         finalize_func=lambda x, _: x)
-    for i in range(1, 11):
-      dataset = dataset_ops.Dataset.range(2 * i).apply(
-          grouping.group_by_reducer(
-              lambda x: math_ops.cast(x, dtypes.int64) % 2, reducer))
-      self.checkResults(
-          dataset, shapes=tensor_shape.scalar(), values=[i - 1, i])
+    num_elements = array_ops.placeholder(dtypes.int64, shape=[])
+    dataset = dataset_ops.Dataset.range(num_elements).apply(
+        grouping.group_by_reducer(
+            lambda x: math_ops.cast(x, dtypes.int64) % 2, reducer))
+    self.checkResults(
+        dataset, shapes=tensor_shape.scalar(),
+        runs=[({num_elements: 2 * i}, [i - 1, i]) for i in range(1, 11)])
 
   def testConcat(self):
-    components = np.array(list("abcdefghijklmnopqrst")).view(np.chararray)
+    components = np.frombuffer(b"abcdefghijklmnopqrst", dtype="|S1")
     reducer = grouping.Reducer(
         init_func=lambda x: "",
         reduce_func=lambda x, y: x + y[0],
         finalize_func=lambda x: x)
-    for i in range(1, 11):
-      dataset = dataset_ops.Dataset.zip(
-          (dataset_ops.Dataset.from_tensor_slices(components),
-           dataset_ops.Dataset.range(2 * i))).apply(
-               grouping.group_by_reducer(lambda x, y: y % 2, reducer))
-      self.checkResults(
-          dataset,
-          shapes=tensor_shape.scalar(),
-          values=[b"acegikmoqs" [:i], b"bdfhjlnprt" [:i]])
+    num_elements = array_ops.placeholder(dtypes.int64, shape=[])
+    dataset = dataset_ops.Dataset.zip(
+        (dataset_ops.Dataset.from_tensor_slices(components),
+         dataset_ops.Dataset.range(num_elements))).apply(
+             grouping.group_by_reducer(lambda x, y: y % 2, reducer))
+    self.checkResults(
+        dataset,
+        shapes=tensor_shape.scalar(),
+        runs=[({num_elements: 2 * i}, [b"acegikmoqs" [:i], b"bdfhjlnprt" [:i]])
+              for i in range(1, 11)])
 
   def testSparseSum(self):
     def _sparse(i):
@@ -103,11 +113,13 @@ class GroupByReducerTest(test_base.DatasetTestBase):
         init_func=lambda _: _sparse(np.int64(0)),
         reduce_func=lambda x, y: _sparse(x.values[0] + y.values[0]),
         finalize_func=lambda x: x.values[0])
-    for i in range(1, 11):
-      dataset = dataset_ops.Dataset.range(2 * i).map(_sparse).apply(
-          grouping.group_by_reducer(lambda x: x.values[0] % 2, reducer))
-      self.checkResults(
-          dataset, shapes=tensor_shape.scalar(), values=[(i - 1) * i, i * i])
+    num_elements = array_ops.placeholder(dtypes.int64, shape=[])
+    dataset = dataset_ops.Dataset.range(num_elements).map(_sparse).apply(
+        grouping.group_by_reducer(lambda x: x.values[0] % 2, reducer))
+    self.checkResults(
+        dataset, shapes=tensor_shape.scalar(),
+        runs=[({num_elements: 2 * i}, [(i - 1) * i, i * i])
+              for i in range(1, 11)])
 
   def testChangingStateShape(self):
 
@@ -201,13 +213,25 @@ class GroupByReducerTest(test_base.DatasetTestBase):
 
 class GroupByWindowTest(test_base.DatasetTestBase):
 
+  @classmethod
+  def setUpClass(cls):
+    super(GroupByWindowTest, cls).setUpClass()
+    rng = np.random.RandomState(0)
+    cls._components_100 = rng.randint(100, size=(200,), dtype=np.int64)
+    cls._components_50 = rng.randint(50, size=(200,), dtype=np.int64)
+
   def testSimple(self):
-    components = np.random.randint(100, size=(200,)).astype(np.int64)
+    components = self._components_100
+    # x * x has the same parity as x, so the squaring can be fused into the
+    # per-window batching without changing the grouping.
     iterator = (
-        dataset_ops.Dataset.from_tensor_slices(components).map(lambda x: x * x)
-        .apply(
-            grouping.group_by_window(lambda x: x % 2, lambda _, xs: xs.batch(4),
-                                     4)).make_initializable_iterator())
+        dataset_ops.Dataset.from_tensor_slices(components).apply(
+            grouping.group_by_window(
+                lambda x: x % 2,
+                lambda _, xs: xs.apply(
+                    batching.map_and_batch(lambda x: x * x, 4)),
+                4)).prefetch(optimization.AUTOTUNE)
+        .make_initializable_iterator())
     init_op = iterator.initializer
     get_next = iterator.get_next()
 
@@ -217,10 +241,8 @@ class GroupByWindowTest(test_base.DatasetTestBase):
       with self.assertRaises(errors.OutOfRangeError):
         while True:
           result = sess.run(get_next)
-          self.assertTrue(
-              all(x % 2 == 0
-                  for x in result) or all(x % 2 == 1)
-              for x in result)
+          parities = result & 1
+          self.assertTrue(not parities.any() or parities.all())
           counts.append(result.shape[0])
 
       self.assertEqual(len(components), sum(counts))
@@ -234,7 +256,8 @@ class GroupByWindowTest(test_base.DatasetTestBase):
     iterator = (
         dataset_ops.Dataset.from_tensor_slices(components).repeat(-1).apply(
             grouping.group_by_window(lambda x: x % 3, lambda _, xs: xs.batch(4),
-                                     4)).make_initializable_iterator())
+                                     4)).prefetch(optimization.AUTOTUNE)
+        .make_initializable_iterator())
     init_op = iterator.initializer
     get_next = iterator.get_next()
 
@@ -255,7 +278,8 @@ class GroupByWindowTest(test_base.DatasetTestBase):
     iterator = (
         dataset_ops.Dataset.from_tensor_slices(components).apply(
             grouping.group_by_window(lambda x: x % 2, lambda _, xs: xs.batch(4),
-                                     4)).make_initializable_iterator())
+                                     4)).prefetch(optimization.AUTOTUNE)
+        .make_initializable_iterator())
     init_op = iterator.initializer
     get_next = iterator.get_next()
 
@@ -284,7 +308,7 @@ class GroupByWindowTest(test_base.DatasetTestBase):
         print(sess.run(get_next))
 
   def testReduceFuncError(self):
-    components = np.random.randint(100, size=(200,)).astype(np.int64)
+    components = self._components_100
 
     def reduce_func(_, xs):
       # Introduce an incorrect padded shape that cannot (currently) be
@@ -308,7 +332,7 @@ class GroupByWindowTest(test_base.DatasetTestBase):
         sess.run(get_next)
 
   def testConsumeWindowDatasetMoreThanOnce(self):
-    components = np.random.randint(50, size=(200,)).astype(np.int64)
+    components = self._components_50
 
     def reduce_func(key, window):
       # Apply two different kinds of padding to the input: tight
@@ -326,6 +350,7 @@ class GroupByWindowTest(test_base.DatasetTestBase):
         .apply(grouping.group_by_window(
             lambda x: math_ops.cast(array_ops.shape(x)[0] // 10, dtypes.int64),
             reduce_func, 4))
+        .prefetch(optimization.AUTOTUNE)
         .make_initializable_iterator())
     init_op = iterator.initializer
     get_next = iterator.get_next()
@@ -343,6 +368,17 @@ class GroupByWindowTest(test_base.DatasetTestBase):
       self.assertEqual(len(components), sum(counts))
 
 
+# Padded shapes for the (scalar, vector, vec3) elements bucketed in BucketTest.
+_BUCKET_PADDED_SHAPES = (tensor_shape.TensorShape([]),
+                         tensor_shape.TensorShape([None]),
+                         tensor_shape.TensorShape([3]))
+
+
+def _vec3(arr):
+  """Returns a read-only view of `arr` with each element repeated 3 times."""
+  return np.broadcast_to(arr[:, None], arr.shape + (3,))
+
+
 # NOTE(mrry): These tests are based on the tests in bucket_ops_test.py.
 # Currently, they use a constant batch size, though should be made to use a
 # different batch size per key.
@@ -355,9 +391,7 @@ class BucketTest(test_base.DatasetTestBase):
     # the arguments.
     return dataset_ops.Dataset.zip(
         (dataset_ops.Dataset.from_tensors(bucket),
-         window.padded_batch(
-             32, (tensor_shape.TensorShape([]), tensor_shape.TensorShape(
-                 [None]), tensor_shape.TensorShape([3])))))
+         window.padded_batch(32, _BUCKET_PADDED_SHAPES)))
 
   def testSingleBucket(self):
 
@@ -365,15 +399,16 @@ class BucketTest(test_base.DatasetTestBase):
       return (v, array_ops.fill([v], v),
               array_ops.fill([3], string_ops.as_string(v)))
 
-    input_dataset = (
-        dataset_ops.Dataset.from_tensor_slices(math_ops.range(32)).map(_map_fn))
+    input_dataset = dataset_ops.Dataset.from_tensor_slices(
+        np.arange(32, dtype=np.int64)).map(_map_fn)
 
     bucketed_dataset = input_dataset.apply(
         grouping.group_by_window(
             lambda x, y, z: 0,
             lambda k, bucket: self._dynamicPad(k, bucket, 32), 32))
 
-    iterator = bucketed_dataset.make_initializable_iterator()
+    iterator = bucketed_dataset.prefetch(
+        optimization.AUTOTUNE).make_initializable_iterator()
     init_op = iterator.initializer
     get_next = iterator.get_next()
 
@@ -385,10 +420,11 @@ class BucketTest(test_base.DatasetTestBase):
       self.assertEqual(0, which_bucket)
 
       expected_scalar_int = np.arange(32, dtype=np.int64)
-      expected_unk_int64 = np.zeros((32, 31)).astype(np.int64)
-      for i in range(32):
-        expected_unk_int64[i, :i] = i
-      expected_vec3_str = np.vstack(3 * [np.arange(32).astype(bytes)]).T
+      expected_unk_int64 = np.zeros((32, 31), dtype=np.int64)
+      values = expected_scalar_int[:, None]
+      mask = np.arange(31) < values
+      expected_unk_int64[mask] = np.broadcast_to(values, mask.shape)[mask]
+      expected_vec3_str = _vec3(np.arange(32).astype(bytes))
 
       self.assertAllEqual(expected_scalar_int, bucketed_values[0])
       self.assertAllEqual(expected_unk_int64, bucketed_values[1])
@@ -400,15 +436,16 @@ class BucketTest(test_base.DatasetTestBase):
       return (v, array_ops.fill([v], v),
               array_ops.fill([3], string_ops.as_string(v)))
 
-    input_dataset = (
-        dataset_ops.Dataset.from_tensor_slices(math_ops.range(64)).map(_map_fn))
+    input_dataset = dataset_ops.Dataset.from_tensor_slices(
+        np.arange(64, dtype=np.int64)).map(_map_fn)
 
     bucketed_dataset = input_dataset.apply(
         grouping.group_by_window(
             lambda x, y, z: math_ops.cast(x % 2, dtypes.int64),
             lambda k, bucket: self._dynamicPad(k, bucket, 32), 32))
 
-    iterator = bucketed_dataset.make_initializable_iterator()
+    iterator = bucketed_dataset.prefetch(
+        optimization.AUTOTUNE).make_initializable_iterator()
     init_op = iterator.initializer
     get_next = iterator.get_next()
 
@@ -429,11 +466,11 @@ class BucketTest(test_base.DatasetTestBase):
 
       # Test the first bucket outputted, the events starting at 0
       expected_scalar_int = np.arange(0, 32 * 2, 2, dtype=np.int64)
-      expected_unk_int64 = np.zeros((32, 31 * 2)).astype(np.int64)
-      for i in range(0, 32):
-        expected_unk_int64[i, :2 * i] = 2 * i
-        expected_vec3_str = np.vstack(
-            3 * [np.arange(0, 32 * 2, 2).astype(bytes)]).T
+      expected_unk_int64 = np.zeros((32, 31 * 2), dtype=np.int64)
+      values = expected_scalar_int[:, None]
+      mask = np.arange(31 * 2) < values
+      expected_unk_int64[mask] = np.broadcast_to(values, mask.shape)[mask]
+      expected_vec3_str = _vec3(np.arange(0, 32 * 2, 2).astype(bytes))
 
       self.assertAllEqual(expected_scalar_int, bucketed_values_even[0])
       self.assertAllEqual(expected_unk_int64, bucketed_values_even[1])
@@ -441,11 +478,11 @@ class BucketTest(test_base.DatasetTestBase):
 
       # Test the second bucket outputted, the odds starting at 1
       expected_scalar_int = np.arange(1, 32 * 2 + 1, 2, dtype=np.int64)
-      expected_unk_int64 = np.zeros((32, 31 * 2 + 1)).astype(np.int64)
-      for i in range(0, 32):
-        expected_unk_int64[i, :2 * i + 1] = 2 * i + 1
-        expected_vec3_str = np.vstack(
-            3 * [np.arange(1, 32 * 2 + 1, 2).astype(bytes)]).T
+      expected_unk_int64 = np.zeros((32, 31 * 2 + 1), dtype=np.int64)
+      values = expected_scalar_int[:, None]
+      mask = np.arange(31 * 2 + 1) < values
+      expected_unk_int64[mask] = np.broadcast_to(values, mask.shape)[mask]
+      expected_vec3_str = _vec3(np.arange(1, 32 * 2 + 1, 2).astype(bytes))
 
       self.assertAllEqual(expected_scalar_int, bucketed_values_odd[0])
       self.assertAllEqual(expected_unk_int64, bucketed_values_odd[1])
@@ -460,18 +497,16 @@ class BucketTest(test_base.DatasetTestBase):
           "z": array_ops.fill([3], string_ops.as_string(v))
       }
 
+    padded_shapes = dict(zip(("x", "y", "z"), _BUCKET_PADDED_SHAPES))
+
     def _dynamic_pad_fn(bucket, window, _):
       return dataset_ops.Dataset.zip(
           (dataset_ops.Dataset.from_tensors(bucket),
-           window.padded_batch(
-               32, {
-                   "x": tensor_shape.TensorShape([]),
-                   "y": tensor_shape.TensorShape([None]),
-                   "z": tensor_shape.TensorShape([3])
-               })))
+           window.padded_batch(32, padded_shapes)))
 
     input_dataset = (
-        dataset_ops.Dataset.from_tensor_slices(math_ops.range(128)).map(_map_fn)
+        dataset_ops.Dataset.from_tensor_slices(np.arange(128, dtype=np.int64))
+        .map(_map_fn)
         .filter(lambda d: math_ops.equal(d["x"] % 2, 0)))
 
     bucketed_dataset = input_dataset.apply(
@@ -479,7 +514,8 @@ class BucketTest(test_base.DatasetTestBase):
             lambda d: math_ops.cast(d["x"] % 2, dtypes.int64),
             lambda k, bucket: _dynamic_pad_fn(k, bucket, 32), 32))
 
-    iterator = bucketed_dataset.make_initializable_iterator()
+    iterator = bucketed_dataset.prefetch(
+        optimization.AUTOTUNE).make_initializable_iterator()
     init_op = iterator.initializer
     get_next = iterator.get_next()
 
@@ -499,7 +535,7 @@ class BucketTest(test_base.DatasetTestBase):
           np.arange(64, 128, 2, dtype=np.int64), bucketed_values_even1["x"])
 
   def testDynamicWindowSize(self):
-    components = np.arange(100).astype(np.int64)
+    components = np.arange(100, dtype=np.int64)
 
     # Key fn: even/odd
     # Reduce fn: batches of 5
@@ -512,7 +548,8 @@ class BucketTest(test_base.DatasetTestBase):
     dataset = dataset_ops.Dataset.from_tensor_slices(components).apply(
         grouping.group_by_window(lambda x: x % 2, lambda _, xs: xs.batch(20),
                                  None, window_size_func))
-    iterator = dataset.make_initializable_iterator()
+    iterator = dataset.prefetch(
+        optimization.AUTOTUNE).make_initializable_iterator()
     init_op = iterator.initializer
     get_next = iterator.get_next()
 
@@ -522,8 +559,9 @@ class BucketTest(test_base.DatasetTestBase):
         batches = 0
         while True:
           result = sess.run(get_next)
-          is_even = all(x % 2 == 0 for x in result)
-          is_odd = all(x % 2 == 1 for x in result)
+          parities = result & 1
+          is_even = not parities.any()
+          is_odd = parities.all()
           self.assertTrue(is_even or is_odd)
           expected_batch_size = 5 if is_even else 10
           self.assertEqual(expected_batch_size, result.shape[0])
@@ -541,12 +579,20 @@ def _to_sparse_tensor(record):
   return sparse_tensor.SparseTensor(**record)
 
 
+def _to_sparse_vector(values):
+  length = array_ops.shape(values, out_type=dtypes.int64)[0]
+  return sparse_tensor.SparseTensor(
+      indices=array_ops.expand_dims(math_ops.range(length), 1),
+      values=values,
+      dense_shape=array_ops.expand_dims(length, 0))
+
+
 def _format_record(array, sparse):
   if sparse:
     return {
-        "values": array,
-        "indices": [[i] for i in range(len(array))],
-        "dense_shape": (len(array),)
+        "values": np.asarray(array, dtype=np.int64),
+        "indices": np.arange(len(array), dtype=np.int64)[:, None],
+        "dense_shape": np.array([len(array)], dtype=np.int64)
     }
   return array
 
@@ -580,24 +626,16 @@ class BucketBySequenceLength(test_base.DatasetTestBase):
     lengths = [8, 13, 25, 35]
 
     def build_dataset(sparse):
-      def _generator():
-        # Produce 1 batch for each bucket
-        elements = []
-        for batch_size, length in zip(batch_sizes, lengths):
-          record_len = length - 1
-          for _ in range(batch_size):
-            elements.append([1] * record_len)
-            record_len = length
-        random.shuffle(elements)
-        for el in elements:
-          yield (_format_record(el, sparse),)
-      dataset = dataset_ops.Dataset.from_generator(
-          _generator,
-          (_get_record_type(sparse),),
-          (_get_record_shape(sparse),))
+      # Produce 1 batch for each bucket, where the first record of each batch
+      # is one shorter than the rest.
+      record_lens = np.repeat(lengths, batch_sizes)
+      record_lens[np.cumsum([0] + batch_sizes[:-1])] -= 1
+      np.random.shuffle(record_lens)
+      dataset = dataset_ops.Dataset.from_tensor_slices(record_lens)
       if sparse:
-        dataset = dataset.map(lambda x: (_to_sparse_tensor(x),))
-      return dataset
+        return dataset.map(
+            lambda n: (_to_sparse_vector(array_ops.ones([n], dtypes.int64)),))
+      return dataset.map(lambda n: (array_ops.ones([n], dtypes.int32),))
 
     def _test_bucket_by_padding(no_padding):
       dataset = build_dataset(sparse=no_padding)
@@ -607,7 +645,8 @@ class BucketBySequenceLength(test_base.DatasetTestBase):
               boundaries,
               batch_sizes,
               no_padding=no_padding))
-      batch, = dataset.make_one_shot_iterator().get_next()
+      batch, = dataset.prefetch(
+          optimization.AUTOTUNE).make_one_shot_iterator().get_next()
 
       with self.cached_session() as sess:
         batches = []
@@ -640,16 +679,12 @@ class BucketBySequenceLength(test_base.DatasetTestBase):
 
     def element_gen():
       # Produce 1 batch for each bucket
-      elements = []
-      for batch_size, length in zip(batch_sizes[:-1], lengths):
-        for _ in range(batch_size):
-          elements.append([1] * length)
-      random.shuffle(elements)
-      for el in elements:
-        yield (el,)
+      record_lens = np.repeat(lengths, batch_sizes[:-1])
+      np.random.shuffle(record_lens)
+      for length in record_lens:
+        yield (np.ones(length, dtype=np.int64),)
       for _ in range(batch_sizes[-1]):
-        el = [1] * (boundaries[-1] + 5)
-        yield (el,)
+        yield (np.ones(boundaries[-1] + 5, dtype=np.int64),)
 
     element_len = lambda el: array_ops.shape(el)[0]
     dataset = dataset_ops.Dataset.from_generator(
@@ -766,15 +801,13 @@ class BucketBySequenceLength(test_base.DatasetTestBase):
     bucket_size = 10
 
     def _build_dataset():
-      input_data = [range(i+1) for i in range(min_len, max_len)]
-      def generator_fn():
-        for record in input_data:
-          yield _format_record(record, sparse=True)
-      dataset = dataset_ops.Dataset.from_generator(
-          generator=generator_fn,
-          output_types=_get_record_type(sparse=True))
-      dataset = dataset.map(_to_sparse_tensor)
-      return dataset
+      return dataset_ops.Dataset.range(min_len, max_len).map(
+          lambda i: _to_sparse_vector(math_ops.range(i + 1)))
+
+    def _sparse_key(indices, values):
+      """Returns a hashable key for the contents of a sparse batch."""
+      return (np.ascontiguousarray(indices, dtype=np.int64).tobytes(),
+              np.ascontiguousarray(values, dtype=np.int64).tobytes())
 
     def _compute_expected_batches():
       """Computes expected batch outputs and stores in a set."""
@@ -784,15 +817,13 @@ class BucketBySequenceLength(test_base.DatasetTestBase):
           batch_start_len = bucket_start_len + batch_offset
           batch_end_len = min(batch_start_len + batch_size,
                               bucket_start_len + bucket_size)
-          expected_indices = []
-          expected_values = []
-          for length in range(batch_start_len, batch_end_len):
-            for val in range(length + 1):
-              expected_indices.append((length - batch_start_len, val))
-              expected_values.append(val)
-          expected_sprs_tensor = (tuple(expected_indices),
-                                  tuple(expected_values))
-          all_expected_sparse_tensors.add(expected_sprs_tensor)
+          # Row `r` of the batch holds the values [0, ..., batch_start_len + r].
+          row_lens = np.arange(batch_start_len, batch_end_len) + 1
+          expected_values = np.concatenate([np.arange(n) for n in row_lens])
+          expected_rows = np.repeat(np.arange(len(row_lens)), row_lens)
+          expected_indices = np.stack([expected_rows, expected_values], axis=1)
+          all_expected_sparse_tensors.add(
+              _sparse_key(expected_indices, expected_values))
       return all_expected_sparse_tensors
 
     def _compute_batches(dataset):
@@ -803,9 +834,7 @@ class BucketBySequenceLength(test_base.DatasetTestBase):
         with self.assertRaises(errors.OutOfRangeError):
           while True:
             output = sess.run(batch)
-            sprs_tensor = (tuple([tuple(idx) for idx in output.indices]),
-                           tuple(output.values))
-            all_sparse_tensors.add(sprs_tensor)
+            all_sparse_tensors.add(_sparse_key(output.indices, output.values))
       return all_sparse_tensors
 
     dataset = _build_dataset()
@@ -21,44 +21,54 @@ from tensorflow.contrib.data.python.ops import optimization
 from tensorflow.python.data.kernel_tests import test_base
 from tensorflow.python.data.ops import dataset_ops
 from tensorflow.python.framework import errors
+from tensorflow.python.framework import test_util
+from tensorflow.python.ops import array_ops
 from tensorflow.python.platform import test
 
 
 class AssertNextDatasetTest(test_base.DatasetTestBase):
 
+  def setUp(self):
+    super(AssertNextDatasetTest, self).setUp()
+    self._dataset = dataset_ops.Dataset.from_tensors(0)
+
+  @test_util.run_in_graph_and_eager_modes
   def testAssertNext(self):
-    dataset = dataset_ops.Dataset.from_tensors(0).apply(
-        optimization.assert_next(["Map"])).map(lambda x: x)
-    iterator = dataset.make_one_shot_iterator()
-    get_next = iterator.get_next()
+    dataset = self._dataset.apply(
+        optimization.assert_next(["Map", "Prefetch"])).map(
+            array_ops.identity).prefetch(optimization.AUTOTUNE)
+    get_next = self.getNext(dataset)
+    self.assertEqual(0, self.evaluate(get_next()))
 
-    with self.cached_session() as sess:
-      self.assertEqual(0, sess.run(get_next))
+  @test_util.run_in_graph_and_eager_modes
+  def testAssertNextMapAndBatchFusion(self):
+    dataset = self._dataset.apply(
+        optimization.assert_next(["MapAndBatch"])).map(
+            array_ops.identity).batch(1).apply(
+                optimization.optimize(["map_and_batch_fusion"]))
+    get_next = self.getNext(dataset)
+    self.assertAllEqual([0], self.evaluate(get_next()))
 
+  @test_util.run_in_graph_and_eager_modes
   def testAssertNextInvalid(self):
-    dataset = dataset_ops.Dataset.from_tensors(0).apply(
-        optimization.assert_next(["Whoops"])).map(lambda x: x)
-    iterator = dataset.make_one_shot_iterator()
-    get_next = iterator.get_next()
-
-    with self.cached_session() as sess:
-      with self.assertRaisesRegexp(
-          errors.InvalidArgumentError,
-          "Asserted Whoops transformation at offset 0 but encountered "
-          "Map transformation instead."):
-        sess.run(get_next)
+    dataset = self._dataset.apply(
+        optimization.assert_next(["Whoops"])).map(array_ops.identity)
+    # In eager mode the assertion fails as soon as the iterator is created,
+    # so the iterator is built inside the `assertRaisesRegexp` block.
+    with self.assertRaisesRegexp(
+        errors.InvalidArgumentError,
+        "Asserted Whoops transformation at offset 0 but encountered "
+        "Map transformation instead."):
+      self.evaluate(self.getNext(dataset)())
 
+  @test_util.run_in_graph_and_eager_modes
   def testAssertNextShort(self):
-    dataset = dataset_ops.Dataset.from_tensors(0).apply(
-        optimization.assert_next(["Map", "Whoops"])).map(lambda x: x)
-    iterator = dataset.make_one_shot_iterator()
-    get_next = iterator.get_next()
-
-    with self.cached_session() as sess:
-      with self.assertRaisesRegexp(
-          errors.InvalidArgumentError,
-          "Asserted next 2 transformations but encountered only 1."):
-        sess.run(get_next)
+    dataset = self._dataset.apply(
+        optimization.assert_next(["Map", "Whoops"])).map(array_ops.identity)
+    with self.assertRaisesRegexp(
+        errors.InvalidArgumentError,
+        "Asserted next 2 transformations but encountered only 1."):
+      self.evaluate(self.getNext(dataset)())
 
 
 if __name__ == "__main__":
@@ -20,24 +20,22 @@ from __future__ import print_function
 import numpy as np
 
 from tensorflow.contrib.data.python.ops import get_single_element
-from tensorflow.contrib.data.python.ops import grouping
 from tensorflow.contrib.framework import with_shape
 from tensorflow.python.data.ops import dataset_ops
 from tensorflow.python.data.util import convert
 from tensorflow.python.data.util import nest
 from tensorflow.python.data.util import sparse
-from tensorflow.python.framework import constant_op
 from tensorflow.python.framework import dtypes
 from tensorflow.python.framework import ops
+from tensorflow.python.framework import smart_cond
 from tensorflow.python.framework import sparse_tensor
 from tensorflow.python.framework import tensor_shape
+from tensorflow.python.framework import tensor_util
 from tensorflow.python.ops import array_ops
 from tensorflow.python.ops import check_ops
 from tensorflow.python.ops import control_flow_ops
-from tensorflow.python.ops import gen_array_ops
 from tensorflow.python.ops import gen_dataset_ops
 from tensorflow.python.ops import math_ops
-from tensorflow.python.ops import sparse_ops
 from tensorflow.python.util import deprecation
 
 
@@ -63,86 +61,38 @@ def batch_window(dataset):
 def _batch_dense_window(dataset):
   """Batches a window of dense tensors."""
 
-  def key_fn(_):
-    return np.int64(0)
+  def count_fn(state, _):
+    return state + 1
 
-  def shape_init_fn(_):
-    return array_ops.shape(first_element)
-
-  def shape_reduce_fn(state, value):
-    check_ops.assert_equal(state, array_ops.shape(value))
-    return state
-
-  def finalize_fn(state):
-    return state
-
-  if dataset.output_shapes.is_fully_defined():
-    shape = dataset.output_shapes
-  else:
-    first_element = get_single_element.get_single_element(dataset.take(1))
-    shape_reducer = grouping.Reducer(shape_init_fn, shape_reduce_fn,
-                                     finalize_fn)
-    shape = get_single_element.get_single_element(
-        dataset.apply(grouping.group_by_reducer(key_fn, shape_reducer)))
-
-  def batch_init_fn(_):
-    batch_shape = array_ops.concat([[0], shape], 0)
-    return gen_array_ops.empty(batch_shape, dtype=dataset.output_types)
-
-  def batch_reduce_fn(state, value):
-    return array_ops.concat([state, [value]], 0)
-
-  batch_reducer = grouping.Reducer(batch_init_fn, batch_reduce_fn, finalize_fn)
+  # `BatchDataset` checks that all elements have the same shape, so the window
+  # can be batched in a single step once its size is known. An empty window is
+  # still reported as an error by `get_single_element`.
+  batch_size = dataset.reduce(np.int64(0), count_fn)
   return get_single_element.get_single_element(
-      dataset.apply(grouping.group_by_reducer(key_fn, batch_reducer)))
+      dataset.batch(math_ops.maximum(batch_size, 1)))
 
 
 def _batch_sparse_window(dataset):
   """Batches a window of sparse tensors."""
 
-  def key_fn(_):
-    return np.int64(0)
-
-  def shape_init_fn(_):
-    return first_element.dense_shape
+  def count_fn(state, _):
+    return state + 1
 
-  def shape_reduce_fn(state, value):
-    check_ops.assert_equal(state, value.dense_shape)
-    return state
-
-  def finalize_fn(state):
-    return state
+  def checked_count_fn(state, value):
+    # `BatchDataset` pads sparse elements to their common maximum shape, so
+    # elements whose shape is not known statically are checked here.
+    assert_op = check_ops.assert_equal(first_element.dense_shape,
+                                       value.dense_shape)
+    with ops.control_dependencies([assert_op]):
+      return state + 1
 
   if dataset.output_shapes.is_fully_defined():
-    shape = dataset.output_shapes
+    batch_size = dataset.reduce(np.int64(0), count_fn)
   else:
     first_element = get_single_element.get_single_element(dataset.take(1))
-    shape_reducer = grouping.Reducer(shape_init_fn, shape_reduce_fn,
-                                     finalize_fn)
-    shape = get_single_element.get_single_element(
-        dataset.apply(grouping.group_by_reducer(key_fn, shape_reducer)))
-
-  def batch_init_fn(_):
-    indices_shape = array_ops.concat([[0], [array_ops.size(shape) + 1]], 0)
-    return sparse_tensor.SparseTensor(
-        indices=gen_array_ops.empty(indices_shape, dtype=dtypes.int64),
-        values=constant_op.constant([], shape=[0], dtype=dataset.output_types),
-        dense_shape=array_ops.concat(
-            [np.array([0], dtype=np.int64),
-             math_ops.cast(shape, dtypes.int64)], 0))
-
-  def batch_reduce_fn(state, value):
-    return sparse_ops.sparse_concat(0, [state, value])
-
-  def reshape_fn(value):
-    return sparse_ops.sparse_reshape(
-        value,
-        array_ops.concat([np.array([1], dtype=np.int64), value.dense_shape], 0))
-
-  batch_reducer = grouping.Reducer(batch_init_fn, batch_reduce_fn, finalize_fn)
+    batch_size = dataset.reduce(np.int64(0), checked_count_fn)
   return get_single_element.get_single_element(
-      dataset.map(reshape_fn).apply(
-          grouping.group_by_reducer(key_fn, batch_reducer)))
+      dataset.batch(math_ops.maximum(batch_size, 1)))
 
 
 def dense_to_sparse_batch(batch_size, row_shape):
@@ -234,14 +184,9 @@ def _padded_batch_dense_window(dataset, padded_shape, padding_value=None):
   padded_shape = math_ops.cast(
       convert.partial_shape_to_tensor(padded_shape), dtypes.int32)
 
-  def key_fn(_):
-    return np.int64(0)
-
-  def max_init_fn(_):
-    return padded_shape
-
   def max_reduce_fn(state, value):
-    """Computes the maximum shape to pad to."""
+    """Counts the elements and computes the maximum shape to pad to."""
+    count, max_shape = state
     condition = math_ops.reduce_all(
         math_ops.logical_or(
             math_ops.less_equal(array_ops.shape(value), padded_shape),
@@ -251,15 +196,11 @@ def _padded_batch_dense_window(dataset, padded_shape, padding_value=None):
         array_ops.shape(value), padded_shape
     ])
     with ops.control_dependencies([assert_op]):
-      return math_ops.maximum(state, array_ops.shape(value))
+      return count + 1, math_ops.maximum(max_shape, array_ops.shape(value))
 
-  def finalize_fn(state):
-    return state
-
-  # Compute the padded shape.
-  max_reducer = grouping.Reducer(max_init_fn, max_reduce_fn, finalize_fn)
-  padded_shape = get_single_element.get_single_element(
-      dataset.apply(grouping.group_by_reducer(key_fn, max_reducer)))
+  # Compute the batch size and the padded shape.
+  batch_size, padded_shape = dataset.reduce((np.int64(0), padded_shape),
+                                            max_reduce_fn)
 
   if padding_value is None:
     if dataset.output_types == dtypes.string:
@@ -271,38 +212,24 @@ def _padded_batch_dense_window(dataset, padded_shape, padding_value=None):
     else:
       padding_value = 0
 
-  def batch_init_fn(_):
-    batch_shape = array_ops.concat(
-        [np.array([0], dtype=np.int32), padded_shape], 0)
-    return gen_array_ops.empty(batch_shape, dtype=dataset.output_types)
-
-  def batch_reduce_fn(state, value):
-    return array_ops.concat([state, [value]], 0)
-
-  def pad_fn(value):
-    shape = array_ops.shape(value)
-    left = array_ops.zeros_like(shape)
-    right = padded_shape - shape
-    return array_ops.pad(
-        value, array_ops.stack([left, right], 1), constant_values=padding_value)
-
-  batch_reducer = grouping.Reducer(batch_init_fn, batch_reduce_fn, finalize_fn)
+  # `PaddedBatchDataset` pads each element straight into its slice of the
+  # output, so the window is padded and batched in a single step.
   return get_single_element.get_single_element(
-      dataset.map(pad_fn).apply(
-          grouping.group_by_reducer(key_fn, batch_reducer)))
+      dataset.padded_batch(
+          math_ops.maximum(batch_size, 1),
+          padded_shapes=math_ops.cast(padded_shape, dtypes.int64),
+          padding_values=ops.convert_to_tensor(
+              padding_value, dtype=dataset.output_types)))
 
 
 def _padded_batch_sparse_window(dataset, padded_shape):
   """Batches a window of sparse tensors with padding."""
 
-  def key_fn(_):
-    return np.int64(0)
-
-  def max_init_fn(_):
-    return convert.partial_shape_to_tensor(padded_shape)
+  padded_shape = convert.partial_shape_to_tensor(padded_shape)
 
   def max_reduce_fn(state, value):
-    """Computes the maximum shape to pad to."""
+    """Counts the elements and computes the maximum shape to pad to."""
+    count, max_shape = state
     condition = math_ops.reduce_all(
         math_ops.logical_or(
             math_ops.less_equal(value.dense_shape, padded_shape),
@@ -312,37 +239,20 @@ def _padded_batch_sparse_window(dataset, padded_shape):
         padded_shape
     ])
     with ops.control_dependencies([assert_op]):
-      return math_ops.maximum(state, value.dense_shape)
-
-  def finalize_fn(state):
-    return state
-
-  # Compute the padded shape.
-  max_reducer = grouping.Reducer(max_init_fn, max_reduce_fn, finalize_fn)
-  padded_shape = get_single_element.get_single_element(
-      dataset.apply(grouping.group_by_reducer(key_fn, max_reducer)))
-
-  def batch_init_fn(_):
-    indices_shape = array_ops.concat([[0], [array_ops.size(padded_shape) + 1]],
-                                     0)
-    return sparse_tensor.SparseTensor(
-        indices=gen_array_ops.empty(indices_shape, dtype=dtypes.int64),
-        values=constant_op.constant([], shape=[0], dtype=dataset.output_types),
-        dense_shape=array_ops.concat(
-            [np.array([0], dtype=np.int64), padded_shape], 0))
-
-  def batch_reduce_fn(state, value):
-    padded_value = sparse_tensor.SparseTensor(
-        indices=value.indices, values=value.values, dense_shape=padded_shape)
-    reshaped_value = sparse_ops.sparse_reshape(
-        padded_value,
-        array_ops.concat(
-            [np.array([1], dtype=np.int64), padded_value.dense_shape], 0))
-    return sparse_ops.sparse_concat(0, [state, reshaped_value])
-
-  reducer = grouping.Reducer(batch_init_fn, batch_reduce_fn, finalize_fn)
-  return get_single_element.get_single_element(
-      dataset.apply(grouping.group_by_reducer(key_fn, reducer)))
+      return count + 1, math_ops.maximum(max_shape, value.dense_shape)
+
+  # Compute the batch size and the padded shape.
+  batch_size, padded_shape = dataset.reduce((np.int64(0), padded_shape),
+                                            max_reduce_fn)
+
+  # Batching prepends the row index to the indices of each element in a single
+  # pass; only the dense shape needs to be widened to the padded shape.
+  batch = get_single_element.get_single_element(
+      dataset.batch(math_ops.maximum(batch_size, 1)))
+  return sparse_tensor.SparseTensor(
+      indices=batch.indices,
+      values=batch.values,
+      dense_shape=array_ops.concat([batch.dense_shape[:1], padded_shape], 0))
 
 
 class _UnbatchDataset(dataset_ops.UnaryDataset):
@@ -525,14 +435,17 @@ class _DenseToSparseBatchDataset(dataset_ops.UnaryDataset):
                       "have a single component, whereas the input has %r." %
                       input_dataset.output_types)
     self._input_dataset = input_dataset
-    self._batch_size = batch_size
-    self._row_shape = row_shape
+    self._batch_size = ops.convert_to_tensor(
+        batch_size, dtype=dtypes.int64, name="batch_size")
+    self._row_shape = convert.partial_shape_to_tensor(row_shape)
+    self._output_shapes = tensor_shape.vector(None).concatenate(
+        tensor_util.constant_value_as_shape(self._row_shape))
 
   def _as_variant_tensor(self):
     return gen_dataset_ops.dense_to_sparse_batch_dataset(
         self._input_dataset._as_variant_tensor(),  # pylint: disable=protected-access
         self._batch_size,
-        row_shape=convert.partial_shape_to_tensor(self._row_shape),
+        row_shape=self._row_shape,
         **dataset_ops.flat_structure(self))
 
   @property
@@ -541,7 +454,7 @@ class _DenseToSparseBatchDataset(dataset_ops.UnaryDataset):
 
   @property
   def output_shapes(self):
-    return tensor_shape.vector(None).concatenate(self._row_shape)
+    return self._output_shapes
 
   @property
   def output_types(self):
@@ -605,11 +518,16 @@ class _RestructuredDataset(dataset_ops.UnaryDataset):
                                                       dataset.output_shapes))
     else:
       if not allow_unsafe_cast:
-        # Validate that the shapes are compatible.
         nest.assert_same_structure(output_types, output_shapes)
+      # Flatten and convert the new shapes once, and reuse them both for
+      # validation and for the restructured `output_shapes`.
+      flat_new_shapes = [
+          tensor_shape.as_shape(shape)
+          for shape in nest.flatten_up_to(output_types, output_shapes)
+      ]
+      if not allow_unsafe_cast:
+        # Validate that the shapes are compatible.
         flat_original_shapes = nest.flatten(dataset.output_shapes)
-        flat_new_shapes = nest.flatten_up_to(output_types, output_shapes)
-
         for original_shape, new_shape in zip(flat_original_shapes,
                                              flat_new_shapes):
           if not original_shape.is_compatible_with(new_shape):
@@ -617,8 +535,8 @@ class _RestructuredDataset(dataset_ops.UnaryDataset):
                 "Dataset with output shapes %r cannot be restructured to have "
                 "incompatible output shapes %r" % (dataset.output_shapes,
                                                    output_shapes))
-      self._output_shapes = nest.map_structure_up_to(
-          output_types, tensor_shape.as_shape, output_shapes)
+      self._output_shapes = nest.pack_sequence_as(output_types,
+                                                  flat_new_shapes)
     if output_classes is None:
       # Inherit class types from the original `dataset`.
       self._output_classes = nest.pack_sequence_as(output_types,
@@ -687,6 +605,11 @@ def assert_element_shape(expected_shapes):
   def _apply_fn(dataset):
     output_shapes = _merge_output_shapes(dataset.output_shapes,
                                          expected_shapes)
+    if all(shape.is_fully_defined()
+           for shape in nest.flatten(dataset.output_shapes)):
+      # The static shapes have been checked by `_merge_output_shapes`, and
+      # `with_shape` would not add any runtime assertion, so skip the map.
+      return dataset
     return _RestructuredDataset(
         dataset.map(_check_shape),
         dataset.output_types,
@@ -710,9 +633,6 @@ class _MapAndBatchDataset(dataset_ops.MapDataset):
     self._drop_remainder_t = ops.convert_to_tensor(
         drop_remainder, dtype=dtypes.bool, name="drop_remainder")
 
-    self._batch_size = batch_size
-    self._drop_remainder = drop_remainder
-
   def _as_variant_tensor(self):
     # pylint: disable=protected-access
     input_resource = self._input_dataset._as_variant_tensor()
@@ -728,7 +648,9 @@ class _MapAndBatchDataset(dataset_ops.MapDataset):
 
   @property
   def output_shapes(self):
-    dim = self._batch_size if self._drop_remainder else None
+    dim = (
+        tensor_util.constant_value(self._batch_size_t)
+        if smart_cond.smart_constant_value(self._drop_remainder_t) else None)
     return nest.pack_sequence_as(self._output_shapes, [
         tensor_shape.vector(dim).concatenate(s)
         for s in nest.flatten(self._output_shapes)
@@ -769,7 +691,9 @@ def map_and_batch(map_func,
     num_parallel_calls: (Optional.) A `tf.int32` scalar `tf.Tensor`,
         representing the number of elements to process in parallel. If not
         specified, `batch_size * num_parallel_batches` elements will be
-        processed in parallel.
+        processed in parallel. If the value `tf.contrib.data.AUTOTUNE` is
+        used, then the number of parallel calls is set dynamically based on
+        available CPU.
 
   Returns:
     A `Dataset` transformation function, which can be passed to
@@ -783,13 +707,24 @@ def map_and_batch(map_func,
   if num_parallel_batches is None and num_parallel_calls is None:
     num_parallel_calls = batch_size
   elif num_parallel_batches is not None and num_parallel_calls is None:
-    num_parallel_calls = batch_size * num_parallel_batches
+    if not (isinstance(batch_size, ops.Tensor) or
+            isinstance(num_parallel_batches, ops.Tensor)):
+      num_parallel_calls = batch_size * num_parallel_batches
   elif num_parallel_batches is not None and num_parallel_calls is not None:
     raise ValueError("The `num_parallel_batches` and `num_parallel_calls` "
                      "arguments are mutually exclusive.")
 
   def _apply_fn(dataset):
+    """Function from `Dataset` to `Dataset` that applies the transformation."""
+    if num_parallel_calls is None:
+      # The tensor product is built here, rather than when the transformation
+      # is created, so that it lands in the same graph as `dataset`.
+      parallel_calls = math_ops.multiply(
+          math_ops.cast(batch_size, dtypes.int64),
+          math_ops.cast(num_parallel_batches, dtypes.int64))
+    else:
+      parallel_calls = num_parallel_calls
     return _MapAndBatchDataset(dataset, map_func, batch_size,
-                               num_parallel_calls, drop_remainder)
+                               parallel_calls, drop_remainder)
 
   return _apply_fn
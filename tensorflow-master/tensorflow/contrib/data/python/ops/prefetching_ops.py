@@ -138,6 +138,13 @@ class _PrefetchToDeviceIterator(object):
     iterator_device = ged_ops.experimental_iterator_get_device(
         self._input_iterator._iterator_resource)
 
+    # The element structure is fixed for the lifetime of the iterator, so the
+    # flattened types and shapes are computed once and reused by `get_next()`.
+    self._flat_output_types = nest.flatten(
+        sparse.as_dense_types(self._input_dataset.output_types,
+                              self._input_dataset.output_classes))
+    self._flat_output_shapes = nest.flatten(self._input_dataset.output_shapes)
+
     with ops.device(device):
       self._buffering_resource = function_buffering_resource(
           f=_prefetch_fn,
@@ -145,9 +152,7 @@ class _PrefetchToDeviceIterator(object):
           string_arg=input_iterator_handle,
           buffer_size=buffer_size,
           shared_name=shared_name,
-          output_types=nest.flatten(
-              sparse.as_dense_types(self._input_dataset.output_types,
-                                    self._input_dataset.output_classes)))
+          output_types=self._flat_output_types)
 
     if not self._one_shot:
       reset_op = function_buffering_resource_reset(self._buffering_resource)
@@ -163,16 +168,14 @@ class _PrefetchToDeviceIterator(object):
 
     flat_ret = ged_ops.experimental_function_buffering_resource_get_next(
         self._buffering_resource,
-        output_types=nest.flatten(
-            sparse.as_dense_types(self.output_types, self.output_classes)),
+        output_types=self._flat_output_types,
         name=name)
 
     ret = sparse.deserialize_sparse_tensors(
         nest.pack_sequence_as(self.output_types, flat_ret),
         self.output_types, self.output_shapes, self.output_classes)
 
-    for tensor, shape in zip(
-        nest.flatten(ret), nest.flatten(self.output_shapes)):
+    for tensor, shape in zip(nest.flatten(ret), self._flat_output_shapes):
       if isinstance(tensor, ops.Tensor):
         tensor.set_shape(shape)
 
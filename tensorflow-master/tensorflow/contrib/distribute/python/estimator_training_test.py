@@ -54,6 +54,12 @@ LABEL_DIMENSION = 2
 DATA = np.linspace(
     0., 2., BATCH_SIZE * LABEL_DIMENSION, dtype=np.float32).reshape(
         BATCH_SIZE, LABEL_DIMENSION)
+LINEAR_FEATURE_COLUMNS = [
+    feature_column.numeric_column("x", shape=(LABEL_DIMENSION,))
+]
+DNN_FEATURE_COLUMNS = [
+    feature_column.numeric_column("x", shape=(LABEL_DIMENSION,))
+]
 EVAL_NAME = "foo"
 EXPORTER_NAME = "saved_model_exporter"
 MAX_STEPS = 10
@@ -66,31 +72,33 @@ PS = dc._TaskType.PS
 original_run_std_server = dc._run_std_server
 
 
+class _ThreadLocalDict(threading.local):
+  """A thread-local holder whose `dict` is created on first use per thread."""
+
+  def __init__(self):
+    super(_ThreadLocalDict, self).__init__()
+    self.dict = dict()
+
+
 class MockOsEnv(dict):
 
   def __init__(self, *args):
-    self._thread_local = threading.local()
+    self._thread_local = _ThreadLocalDict()
     super(MockOsEnv, self).__init__(*args)
 
   def get(self, key, default):
-    if not hasattr(self._thread_local, "dict"):
-      self._thread_local.dict = dict()
     if key == "TF_CONFIG":
       return dict.get(self._thread_local.dict, key, default)
     else:
       return dict.get(self, key, default)
 
   def __getitem__(self, key):
-    if not hasattr(self._thread_local, "dict"):
-      self._thread_local.dict = dict()
     if key == "TF_CONFIG":
       return dict.__getitem__(self._thread_local.dict, key)
     else:
       return dict.__getitem__(self, key)
 
   def __setitem__(self, key, val):
-    if not hasattr(self._thread_local, "dict"):
-      self._thread_local.dict = dict()
     if key == "TF_CONFIG":
       return dict.__setitem__(self._thread_local.dict, key, val)
     else:
@@ -124,7 +132,7 @@ class DistributeCoordinatorIntegrationTest(test.TestCase,
       dataset = dataset_ops.Dataset.from_tensor_slices((x, y))
       if shuffle:
         dataset = dataset.shuffle(batch_size)
-      dataset = dataset.repeat(100).batch(batch_size)
+      dataset = dataset.repeat(100).batch(batch_size).prefetch(1)
       return dataset
 
     return input_fn
@@ -144,10 +152,8 @@ class DistributeCoordinatorIntegrationTest(test.TestCase,
     global_step_count = None
 
     for e in summary_iterator.summary_iterator(event_paths[-1]):
-      current_loss = None
-      for v in e.summary.value:
-        if v.tag == "loss":
-          current_loss = v.simple_value
+      current_loss = next(
+          (v.simple_value for v in e.summary.value if v.tag == "loss"), None)
 
       # If loss is not found, global step is meaningless.
       if current_loss is None:
@@ -164,18 +170,10 @@ class DistributeCoordinatorIntegrationTest(test.TestCase,
                      train_distribute,
                      eval_distribute,
                      remote_cluster=None):
-    input_dimension = LABEL_DIMENSION
-    linear_feature_columns = [
-        feature_column.numeric_column("x", shape=(input_dimension,))
-    ]
-    dnn_feature_columns = [
-        feature_column.numeric_column("x", shape=(input_dimension,))
-    ]
-
     return dnn_linear_combined.DNNLinearCombinedRegressor(
-        linear_feature_columns=linear_feature_columns,
+        linear_feature_columns=LINEAR_FEATURE_COLUMNS,
         dnn_hidden_units=(2, 2),
-        dnn_feature_columns=dnn_feature_columns,
+        dnn_feature_columns=DNN_FEATURE_COLUMNS,
         label_dimension=LABEL_DIMENSION,
         model_dir=self._model_dir,
         dnn_optimizer=adagrad.AdagradOptimizer(0.001),
@@ -193,7 +191,6 @@ class DistributeCoordinatorIntegrationTest(test.TestCase,
     estimator = self._get_estimator(train_distribute, eval_distribute,
                                     remote_cluster)
 
-    input_dimension = LABEL_DIMENSION
     train_input_fn = self.dataset_input_fn(
         x={"x": DATA},
         y=DATA,
@@ -206,13 +203,7 @@ class DistributeCoordinatorIntegrationTest(test.TestCase,
     eval_input_fn = self.dataset_input_fn(
         x={"x": DATA}, y=DATA, batch_size=eval_batch_size, shuffle=False)
 
-    linear_feature_columns = [
-        feature_column.numeric_column("x", shape=(input_dimension,))
-    ]
-    dnn_feature_columns = [
-        feature_column.numeric_column("x", shape=(input_dimension,))
-    ]
-    feature_columns = linear_feature_columns + dnn_feature_columns
+    feature_columns = LINEAR_FEATURE_COLUMNS + DNN_FEATURE_COLUMNS
 
     estimator_training.train_and_evaluate(
         estimator,
@@ -302,22 +293,13 @@ class DistributeCoordinatorIntegrationTest(test.TestCase,
 
   def _run_task_in_thread(self, cluster_spec, task_type, task_id,
                           train_distribute, eval_distribute):
-    if task_type:
-      tf_config = {
-          "cluster": cluster_spec,
-          "task": {
-              "type": task_type,
-              "index": task_id
-          }
-      }
-    else:
-      tf_config = {
-          "cluster": cluster_spec,
-          "task": {
-              "type": task_type,
-              "index": task_id
-          }
-      }
+    tf_config = {
+        "cluster": cluster_spec,
+        "task": {
+            "type": task_type,
+            "index": task_id
+        }
+    }
     t = threading.Thread(
         target=self._task_thread,
         args=(train_distribute, eval_distribute, tf_config))
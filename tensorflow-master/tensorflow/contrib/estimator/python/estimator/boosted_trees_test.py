@@ -41,18 +41,23 @@ INPUT_FEATURES = np.array(
         [3.0, 20.0, 50.0, -100.0, 102.75],     # feature_2 quantized:[2,3,3,0,3]
     ],
     dtype=np.float32)
-CLASSIFICATION_LABELS = [[0.], [1.], [1.], [0.], [0.]]
-REGRESSION_LABELS = [[1.5], [0.3], [0.2], [2.], [5.]]
+CLASSIFICATION_LABELS = np.array(
+    [[0.], [1.], [1.], [0.], [0.]], dtype=np.float32)
+REGRESSION_LABELS = np.array(
+    [[1.5], [0.3], [0.2], [2.], [5.]], dtype=np.float32)
 FEATURES_DICT = {'f_%d' % i: INPUT_FEATURES[i] for i in range(NUM_FEATURES)}
+FEATURE_COLUMNS = frozenset(
+    feature_column.bucketized_column(
+        feature_column.numeric_column('f_%d' % i, dtype=dtypes.float32),
+        BUCKET_BOUNDARIES) for i in range(NUM_FEATURES))
 
 
 def _make_train_input_fn(is_classification):
   """Makes train input_fn for classification/regression."""
 
   def _input_fn():
-    features_dict = dict(FEATURES_DICT)
     labels = CLASSIFICATION_LABELS if is_classification else REGRESSION_LABELS
-    return features_dict, labels
+    return FEATURES_DICT, labels
 
   return _input_fn
 
@@ -61,10 +66,9 @@ def _make_train_input_fn_dataset(is_classification):
   """Makes input_fn using Dataset."""
 
   def _input_fn():
-    features_dict = dict(FEATURES_DICT)
     labels = CLASSIFICATION_LABELS if is_classification else REGRESSION_LABELS
     ds = dataset_ops.Dataset.zip(
-        (dataset_ops.Dataset.from_tensors(features_dict),
+        (dataset_ops.Dataset.from_tensors(FEATURES_DICT),
          dataset_ops.Dataset.from_tensors(labels)
         ))
     return ds
@@ -76,12 +80,7 @@ class BoostedTreesEstimatorTest(test_util.TensorFlowTestCase):
 
   def setUp(self):
     self._head = canned_boosted_trees._create_regression_head(label_dimension=1)
-    self._feature_columns = {
-        feature_column.bucketized_column(
-            feature_column.numeric_column('f_%d' % i, dtype=dtypes.float32),
-            BUCKET_BOUNDARIES)
-        for i in range(NUM_FEATURES)
-    }
+    self._feature_columns = FEATURE_COLUMNS
 
   def _assert_checkpoint(self, model_dir, global_step, finalized_trees,
                          attempted_layers):
@@ -92,7 +91,7 @@ class BoostedTreesEstimatorTest(test_util.TensorFlowTestCase):
     ensemble_proto.ParseFromString(serialized)
     self.assertEqual(
         finalized_trees,
-        sum([1 for t in ensemble_proto.tree_metadata if t.is_finalized]))
+        sum(t.is_finalized for t in ensemble_proto.tree_metadata))
     self.assertEqual(attempted_layers,
                      ensemble_proto.growing_metadata.num_layers_attempted)
 
@@ -364,11 +363,7 @@ class BoostedTreesDebugOutputTest(test_util.TensorFlowTestCase):
 
   def setUp(self):
     self._head = canned_boosted_trees._create_regression_head(label_dimension=1)
-    self._feature_columns = {
-        feature_column.bucketized_column(
-            feature_column.numeric_column('f_%d' % i, dtype=dtypes.float32),
-            BUCKET_BOUNDARIES) for i in range(NUM_FEATURES)
-    }
+    self._feature_columns = FEATURE_COLUMNS
 
   def testContribEstimatorThatDFCIsInPredictions(self):
     # pylint:disable=protected-access